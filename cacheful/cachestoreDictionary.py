@@ -28,6 +28,15 @@ class CacheStoreDictionary(dict):
         self.store[set_values[0]] = set_values[1:]
         self.commit()
 
+    def set_many(self, rows):
+        """
+        Sets several rows, each in the same form that set expects, and commits
+        them to the file once.
+        """
+        for set_values in rows:
+            self.store[set_values[0]] = set_values[1:]
+        self.commit()
+
     def commit(self):
         if self._dbexists():
             with open(self.origin, 'wb') as f:
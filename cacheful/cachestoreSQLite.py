@@ -35,13 +35,7 @@ class CacheStoreSqlite(object):
 
     def set(self, set_values):
         if self._validate_set(self.columns, set_values):
-            query = "INSERT INTO CACHE(ID, "
-            for col in self.columns:
-                query += " " + col[0] + ","
-            query = query[:-1] + ") VALUES("
-            for val in set_values:
-                query += " " + val + ","
-            query = query[:-1] + ");"
+            query = self._insertquery(set_values, "INSERT")
             with self.getconn() as conn:
                 cur = conn.cursor()
                 cur.execute(query)
@@ -49,6 +43,20 @@ class CacheStoreSqlite(object):
         else:
             raise ValueError("Should set the ID value but no the ID column, see documentation")
 
+    def set_many(self, rows):
+        """
+        Sets several rows, each in the same form that set expects, in a single
+        transaction. Rows whose ID already exists are replaced.
+        """
+        for set_values in rows:
+            if not self._validate_set(self.columns, set_values):
+                raise ValueError("Should set the ID value but no the ID column, see documentation")
+        with self.getconn() as conn:
+            cur = conn.cursor()
+            for set_values in rows:
+                cur.execute(self._insertquery(set_values, "INSERT OR REPLACE"))
+            conn.commit()
+
     def getconn(self):
         """
         This function gives a connection to the variable validating that the DB exists.
@@ -74,6 +82,15 @@ class CacheStoreSqlite(object):
             cur.execute(query)
             conn.commit()
 
+    def _insertquery(self, set_values, verb):
+        query = verb + " INTO CACHE(ID, "
+        for col in self.columns:
+            query += " " + col[0] + ","
+        query = query[:-1] + ") VALUES("
+        for val in set_values:
+            query += " " + val + ","
+        return query[:-1] + ");"
+
     def _validate_string(self,string):
         return isinstance(string, str)
 
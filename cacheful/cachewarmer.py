@@ -0,0 +1,262 @@
+"""
+The cachewarmer module keeps a cache store warm so that reads do not fall on
+cold misses after an entry expires or the application restarts.
+
+Loader functions are registered per key or per key prefix. A loader takes the
+key and returns the values of the row (without the ID) in the same form that
+the store's set method expects.
+
+The method preload bulk-loads a hot set of keys, usually at startup, and the
+method schedule uses the timechecker module to recompute those keys shortly
+before they expire. In both cases the work is spread with a random jitter,
+limited to a number of concurrent loaders and written back to the
+CacheStoreSqlite or CacheStoreDictionary in batches.
+
+Refresh results are reported through a pubsubscribe.Publisher, see the
+pubsubscribe module for more.
+"""
+from __future__ import print_function
+from collections import deque
+import random
+import threading
+import time
+from pubsubscribe import Publisher
+import timechecker
+
+
+class CacheWarmer(object):
+    """
+    Class that recomputes cache entries with registered loaders and writes
+    them back to a cache store.
+    """
+
+    def __init__(self, store, hotset=None, publisher=None, batch_size=50,
+                 concurrency=4, jitter=0.5):
+        """
+        store is a CacheStoreSqlite or CacheStoreDictionary object (anything
+        with a set_many method). hotset is the list of keys preloaded by
+        preload and refreshed by schedule when no keys are given.
+
+        batch_size is the number of rows written to the store at once,
+        concurrency is the number of loaders that run at the same time and
+        jitter is the maximum number of seconds each load is delayed by.
+        """
+        if not hasattr(store, 'set_many'):
+            raise TypeError('store must have a set_many method.')
+        if not publisher:
+            publisher = Publisher()
+        if type(publisher) is not Publisher:
+            raise TypeError('publisher must be of type Publisher.')
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError('batch_size and concurrency must be at least 1.')
+        if jitter < 0:
+            raise ValueError('jitter can not be negative.')
+        self.store = store
+        self.hotset = list(hotset or [])
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.loaders = {}
+        self.prefixloaders = {}
+
+    def register(self, key, loader, prefix=False):
+        """
+        Registers loader as the function that recomputes key. If prefix is
+        True, loader is used for every key whose string form starts with key.
+        Exact keys win over prefixes and longer prefixes win over shorter ones.
+        """
+        if not hasattr(loader, '__call__'):
+            raise TypeError('loader must be a callable function.')
+        if prefix:
+            self.prefixloaders[str(key)] = loader
+        else:
+            self.loaders[key] = loader
+
+    def getloader(self, key):
+        """
+        Returns the loader registered for key, or None if there is none.
+        """
+        if key in self.loaders:
+            return self.loaders[key]
+        skey = str(key)
+        matches = [p for p in self.prefixloaders if skey.startswith(p)]
+        if len(matches) > 0:
+            return self.prefixloaders[max(matches, key=len)]
+        return None
+
+    def preload(self, keys=None):
+        """
+        Bulk-loads keys, or the hot set if keys is not given, into the store.
+        """
+        if keys is None:
+            keys = self.hotset
+        self.publisher.publish('EVENT', {'message': 'Preloading hot set.',
+                                         'details': {'keys': len(keys)}})
+        return self.refresh(keys)
+
+    def refresh(self, keys=None):
+        """
+        Recomputes keys, or the hot set if keys is not given, and writes them
+        back to the store in batches. Returns a dictionary with the refreshed,
+        skipped and failed keys.
+        """
+        if keys is None:
+            keys = self.hotset
+        result = {'refreshed': [], 'skipped': [], 'failed': []}
+        pending = deque(keys)
+        rows = []
+        lock = threading.Lock()
+        writelock = threading.Lock()
+        t = time.time()
+
+        def worker():
+            while True:
+                with lock:
+                    if len(pending) == 0:
+                        return
+                    key = pending.popleft()
+                loader = self.getloader(key)
+                if loader is None:
+                    with lock:
+                        result['skipped'].append(key)
+                    continue
+                if self.jitter > 0:
+                    time.sleep(random.uniform(0, self.jitter))
+                try:
+                    row = [key] + list(loader(key))
+                except Exception as e:
+                    with lock:
+                        result['failed'].append(key)
+                    self.publisher.publish('ERROR', {
+                        'message': 'Loader failed.',
+                        'details': {'key': key, 'exception': e}})
+                    continue
+                batch = None
+                with lock:
+                    rows.append(row)
+                    if len(rows) >= self.batch_size:
+                        batch = rows[:]
+                        del rows[:]
+                if batch:
+                    with writelock:
+                        written, failed = self._write(batch)
+                    with lock:
+                        result['refreshed'].extend(written)
+                        result['failed'].extend(failed)
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(min(self.concurrency, len(pending)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(rows) > 0:
+            written, failed = self._write(rows)
+            with lock:
+                result['refreshed'].extend(written)
+                result['failed'].extend(failed)
+
+        elapsed = str(time.time() - t) + ' seconds'
+        if len(result['skipped']) > 0:
+            self.publisher.publish('WARNING', {
+                'message': 'Skipped keys without a loader.',
+                'details': {'keys': result['skipped']}})
+        self.publisher.publish('EVENT', {
+            'message': 'Refresh completed.',
+            'details': {'refreshed': len(result['refreshed']),
+                        'skipped': len(result['skipped']),
+                        'failed': len(result['failed']),
+                        'timeelapsed': elapsed}})
+        return result
+
+    def schedule(self, EXPIRY_TIME, EXPIRY_PERIOD, LEAD='00:01:00',
+                 keys=None, UPDATE_PID_NAME='warmer.pid'):
+        """
+        Refreshes keys, or the hot set if keys is not given, LEAD before each
+        expiry using the timechecker module.
+
+        EXPIRY_TIME is the first time the entries expire and EXPIRY_PERIOD is
+        the length of time between expiries, both as 'HH:MM:SS' strings as
+        timechecker.timer expects. LEAD is how long before the expiry the
+        refresh runs and should be shorter than EXPIRY_PERIOD.
+
+        timechecker only checks the clock every EXPIRY_PERIOD / 100, so the
+        refresh can start up to that long after its scheduled time. LEAD must
+        be at least that interval for the refresh to start by the expiry,
+        otherwise a ValueError is raised. For the refresh to also finish
+        ahead of the expiry, add its expected duration to LEAD; the jitter
+        alone adds about len(keys) * jitter / 2 / concurrency seconds.
+
+        Like timechecker.timer, this call blocks, so run it in its own thread
+        or process.
+        """
+        time.strptime(LEAD, '%H:%M:%S')
+        lead = timechecker._periodtoseconds(LEAD)
+        period = timechecker._checkperiodvar(EXPIRY_PERIOD)
+        if lead >= period:
+            raise ValueError('LEAD must be shorter than EXPIRY_PERIOD, not ' +
+                             '{}'.format(LEAD))
+        if lead < int(period / 100):
+            raise ValueError('LEAD must be at least the timechecker polling ' +
+                             'interval of {} seconds, not {}'
+                             .format(int(period / 100), LEAD))
+        utime = _leadtime(timechecker._checktimevar(EXPIRY_TIME), lead,
+                          period)
+        self.publisher.publish('EVENT', {'message': 'Scheduling refresh.',
+                                         'details': {'updatetime': utime,
+                                                     'expirytime': EXPIRY_TIME,
+                                                     'lead': LEAD}})
+        timechecker.timer(self.refresh, (keys,), utime, EXPIRY_PERIOD,
+                          UPDATE_PID_NAME, self.publisher)
+
+    def _write(self, batch):
+        """
+        Writes batch to the store, retrying row by row if the batch fails.
+        Returns the lists of written and failed keys.
+        """
+        t = time.time()
+        try:
+            self.store.set_many(batch)
+        except Exception as e:
+            self.publisher.publish('WARNING', {
+                'message': 'Could not write batch, retrying row by row.',
+                'details': {'rows': len(batch), 'exception': e}})
+            written = []
+            failed = []
+            for row in batch:
+                if self._writerow(row):
+                    written.append(row[0])
+                else:
+                    failed.append(row[0])
+            return written, failed
+        elapsed = str(time.time() - t) + ' seconds'
+        self.publisher.publish('INFO', {'message': 'Batch written.',
+                                        'details': {'rows': len(batch),
+                                                    'timeelapsed': elapsed}})
+        return [row[0] for row in batch], []
+
+    def _writerow(self, row):
+        try:
+            self.store.set_many([row])
+        except Exception as e:
+            self.publisher.publish('ERROR', {
+                'message': 'Could not write row.',
+                'details': {'key': row[0], 'exception': e}})
+            return False
+        return True
+
+
+def _leadtime(utime, lead, period):
+    """
+    Moves the 'HH:MM:SS' time utime lead seconds back. If that falls before
+    midnight, one period is added instead of wrapping around the day, since
+    timechecker._makestart always places the time on today's date and the
+    refreshes have to stay in phase with the expiries.
+    """
+    seconds = timechecker._periodtoseconds(utime) - lead
+    if seconds < 0:
+        seconds += period
+    return '{:02d}:{:02d}:{:02d}'.format(seconds // 3600,
+                                         (seconds // 60) % 60, seconds % 60)
@@ -1,6 +1,7 @@
 import pytest
 import cacheful.cachestoreSQLite as ca
 import threading
+import os
 
 def test_init():
     columns = [["COUNT","INT"],["NOMBRE","TEXT"]]
@@ -24,3 +25,12 @@ def test_set_get():
     c.set(set_val)
     t = c.get("10")
     assert [(10,11,'Acc')] == t
+
+def test_set_many():
+    columns = [["COUNT","INT"],["NOMBRE","TEXT"]]
+    c = ca.CacheStoreSqlite("tempmany.db", columns)
+    c.set(["10","11","\'Acc\'"])
+    c.set_many([["10","12","\'Rep\'"],["20","21","\'New\'"]])
+    assert [(10,12,'Rep')] == c.get("10")
+    assert [(20,21,'New')] == c.get("20")
+    os.remove("tempmany.db")
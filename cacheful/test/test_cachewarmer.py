@@ -0,0 +1,122 @@
+"""
+Test file for the cachewarmer module.
+"""
+import cacheful.cachewarmer as cachewarmer
+import cacheful.timechecker as timechecker
+import cacheful.cachestoreDictionary as ca
+import cacheful.cachestoreSQLite as cs
+from cacheful.pubsubscribe import Publisher
+import os
+import datetime
+import pytest
+
+
+class Recorder(object):
+
+    def __init__(self):
+        self.notes = []
+
+    def notify(self, notedict, notestring):
+        self.notes.append(notedict)
+
+
+def load(key):
+    return ['warm', key * 2]
+
+
+def fail(key):
+    raise ValueError('No value for {}'.format(key))
+
+
+def test_getloader():
+    c = ca.CacheStoreDictionary("warmtest")
+    w = cachewarmer.CacheWarmer(c)
+    w.register(1, load)
+    w.register('u', fail, prefix=True)
+    w.register('user', load, prefix=True)
+
+    assert(w.getloader(1) is load)
+    assert(w.getloader('user1') is load)
+    assert(w.getloader('u1') is fail)
+    assert(w.getloader(2) is None)
+
+    with pytest.raises(TypeError):
+        w.register(3, 'notcallable')
+    os.remove("warmtest")
+
+
+def test_preload():
+    c = ca.CacheStoreDictionary("warmtest")
+    publisher = Publisher()
+    recorder = Recorder()
+    publisher.subscribe(recorder, level='INFO')
+    w = cachewarmer.CacheWarmer(c, hotset=[1, 2, 3, 4, 5, 6, 7],
+                                publisher=publisher, batch_size=3,
+                                concurrency=2, jitter=0)
+    w.register(7, fail)
+    for key in range(1, 6):
+        w.register(key, load)
+
+    result = w.preload()
+    assert(sorted(result['refreshed']) == [1, 2, 3, 4, 5])
+    assert(result['skipped'] == [6])
+    assert(result['failed'] == [7])
+    assert([3, ['warm', 6]] == c.get(3))
+    assert([3, ['warm', 6]] == ca.CacheStoreDictionary("warmtest").get(3))
+
+    messages = [note['message'] for note in recorder.notes]
+    assert(messages.count('Batch written.') == 2)
+    assert('Skipped keys without a loader.' in messages)
+    assert('Loader failed.' in messages)
+    assert(recorder.notes[-1]['details']['refreshed'] == 5)
+    os.remove("warmtest")
+
+
+def test_refresh_bad_row():
+    columns = [["COUNT","INT"],["NOMBRE","TEXT"]]
+    c = cs.CacheStoreSqlite("warmtest.db", columns)
+    w = cachewarmer.CacheWarmer(c, batch_size=2, concurrency=1, jitter=0)
+    w.register("10", lambda key: ["11", "\'Acc\'"])
+    w.register("1x", lambda key: ["11"])
+
+    result = w.refresh(["10", "1x"])
+    assert(result['refreshed'] == ["10"])
+    assert(result['failed'] == ["1x"])
+    assert([(10,11,'Acc')] == c.get("10"))
+    os.remove("warmtest.db")
+
+
+def test_schedule():
+    c = ca.CacheStoreDictionary("warmtest")
+    w = cachewarmer.CacheWarmer(c)
+
+    # Malformed or negative lead
+    with pytest.raises(ValueError):
+        w.schedule('10:00:00', '12:00:00', LEAD='1:00')
+    with pytest.raises(ValueError):
+        w.schedule('10:00:00', '12:00:00', LEAD='-1:00:00')
+
+    # Lead at or above the period
+    with pytest.raises(ValueError):
+        w.schedule('10:00:00', '00:10:00', LEAD='00:10:00')
+
+    # Lead below the polling interval of 432 seconds
+    with pytest.raises(ValueError):
+        w.schedule('10:00:00', '12:00:00', LEAD='00:07:11')
+    os.remove("warmtest")
+
+
+def test_leadtime():
+    assert(cachewarmer._leadtime('10:30:00', 90, 3600) == '10:28:30')
+
+    # Lead crosses midnight with a period that does not divide a day, so the
+    # refresh should still land exactly lead seconds before an expiry
+    expiry = '00:00:30'
+    period = timechecker._checkperiodvar('05:00:00')
+    lead = 60
+    utime = cachewarmer._leadtime(expiry, lead, period)
+    assert(utime == '04:59:30')
+    refresh = timechecker._makestart(utime, period)
+    nextexpiry = timechecker._makestart(expiry, period)
+    offset = refresh + datetime.timedelta(seconds=lead) - nextexpiry
+    assert(offset.total_seconds() % period == 0)